@@ -1,11 +1,24 @@
+import io
+import errno
 import os
+import json
 import uuid
 import shutil
-import gc  # Garbage Collector for memory management
+import sqlite3
+import hashlib
+import functools
+import contextlib
+import operator
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import gc
+import httpx
 from flask import Flask, render_template, request, jsonify
 from huggingface_hub import InferenceClient
 from gradio_client import Client as GrClient, handle_file
-from PIL import Image
+from PIL import Image, ImageOps
 from dotenv import load_dotenv
 
 # 1. Load Environment Variables
@@ -14,157 +27,561 @@ HF_TOKEN = os.getenv("HF_TOKEN")
 
 # 2. Setup Flask App
 app = Flask(__name__)
+# Behind a server that honours X-Sendfile (Apache mod_xsendfile, lighttpd), static
+# files are handed to the kernel's sendfile(2) instead of being streamed by Python
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
 
 # 3. Configuration
 # SDXL for Image Generation
 IMAGE_MODEL = "stabilityai/stable-diffusion-xl-base-1.0"
 # Emotion Detection Model
 EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+# Called directly (not via InferenceClient) because it accepts a list of texts per request
+EMOTION_API_URL = f"https://router.huggingface.co/hf-inference/models/{EMOTION_MODEL}"
+# DistilRoBERTa reads at most 512 tokens; longer stories are cut to keep calls fast and valid
+MAX_EMOTION_CHARS = 1000
+# Seconds to wait for one batched emotion API call
+EMOTION_TIMEOUT = 30
 # Video Generation Space
 VIDEO_SPACE = "multimodalart/stable-video-diffusion"
+# Arguments passed to the SVD space after the image (also part of the video cache key)
+SVD_ARGS = (0, 10)
+# Visual style added to the image prompt for each detected emotion
+STYLE_MAP = {
+    "joy": "bright, vibrant, warm lighting, happy atmosphere",
+    "sadness": "rain, dark blue tones, cinematic, gloomy, lonely",
+    "fear": "misty, horror, dark, cold tones, mysterious",
+    "love": "romantic, soft focus, pink and red tones, dreamy",
+    "anger": "intense, red, fire, high contrast, dramatic",
+    "neutral": "cinematic, photorealistic"
+}
+PROMPT_TMPL = "{text}, {style}, 8k, highly detailed, movie scene"
+# SQLite file shared by all workers: emotion cache and job status
+CACHE_DB = "feelframe_cache.db"
+# Each process refreshes its heartbeat this often
+HEARTBEAT_INTERVAL = 30
+# A process whose heartbeat is older than this is gone (restart, OOM kill...),
+# and its unfinished jobs are reported as lost
+WORKER_STALE_AFTER = 4 * HEARTBEAT_INTERVAL
+# Finished jobs (and jobs of dead workers) older than this are pruned
+JOB_RETENTION = 60 * 60
 
 # 4. Ensure directories exist
 os.makedirs("static/generated", exist_ok=True)
 
 # 5. Initialize Clients
 # We define clients globally, but we will manage their memory usage carefully
-hf_client = InferenceClient(token=HF_TOKEN)
+# X-Use-Cache lets the HF Inference API answer repeated inputs from its own cache
+hf_client = InferenceClient(token=HF_TOKEN, headers={"X-Use-Cache": "true"})
 
-def cleanup_memory():
-    """Forces Python to release unused memory immediately."""
-    gc.collect()
+# Plain HTTP client for batched emotion calls
+emotion_http = httpx.Client(
+    headers={"Authorization": f"Bearer {HF_TOKEN}", "X-Use-Cache": "true"} if HF_TOKEN else {"X-Use-Cache": "true"},
+    timeout=EMOTION_TIMEOUT
+)
+
+# Generation jobs running at once per process
+JOB_WORKERS = 4
+
+# Small pool of Gradio clients, one per job worker. Each client connects on first use
+# and is then reused, so the space handshake (config + API schema download) is not
+# repeated on every request. Gradio clients are not fully thread-safe, so each one is
+# lent to a single thread at a time, while different jobs still run SVD in parallel.
+svd_clients = queue.Queue()
+for _ in range(JOB_WORKERS):
+    svd_clients.put(None)
+
+# Shared pool for overlapping independent I/O steps inside a request
+pool = ThreadPoolExecutor(max_workers=8)
+
+# Generation jobs run here, so /generate can answer right away.
+# Kept separate from `pool` so running jobs can never starve their own sub-steps.
+job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS)
+# Jobs accepted per process (running + waiting); /generate answers 503 beyond this
+MAX_PENDING_JOBS = 4 * JOB_WORKERS
+pending_jobs = 0
+pending_lock = threading.Lock()
+
+# Id of this process in the workers table (set on first job, see current_worker)
+worker_id = None
+worker_pid = None
+worker_lock = threading.Lock()
+
+# Long-lived globals (clients, app, pool) are moved out of future GC scans
+gc.freeze()
+
+# 6. Emotion Cache + Job Status (shared by all workers through SQLite)
+with sqlite3.connect(CACHE_DB) as db:
+    db.execute("CREATE TABLE IF NOT EXISTS emotions (text_hash TEXT PRIMARY KEY, label TEXT)")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS jobs "
+        "(job_id TEXT PRIMARY KEY, event TEXT, updated_at REAL, owner TEXT, finished INTEGER)"
+    )
+    db.execute("CREATE TABLE IF NOT EXISTS workers (owner TEXT PRIMARY KEY, seen_at REAL)")
+    # Databases created before these columns existed
+    job_columns = [col[1] for col in db.execute("PRAGMA table_info(jobs)")]
+    for column, kind in (("updated_at", "REAL"), ("owner", "TEXT"), ("finished", "INTEGER")):
+        if column not in job_columns:
+            db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+by_score = operator.itemgetter('score')
+
+def classify_batch(texts):
+    """Classifies several texts in one HF Inference API call; returns the top label for each."""
+    response = emotion_http.post(EMOTION_API_URL, json={"inputs": texts})
+    response.raise_for_status()
+
+    labels = []
+    for scores in response.json():
+        # Depending on the pipeline settings each entry is a list of scores or a single top score
+        if isinstance(scores, dict):
+            scores = [scores]
+        top_emotion = max(scores, key=by_score)
+        labels.append(top_emotion['label'])
+
+    if len(labels) != len(texts):
+        raise ValueError(f"Expected {len(texts)} emotion results, got {len(labels)}")
+    return labels
+
+class EmotionBatcher:
+    """
+    Micro-batches emotion requests from concurrent request threads.
+    A background thread waits for the first text, collects more for up to
+    max_wait seconds (or until max_batch texts), then sends them as one API call.
+    The thread starts on first use, so it also exists in workers forked after import
+    (e.g. gunicorn --preload).
+    """
+
+    def __init__(self, max_batch=8, max_wait=0.05):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = queue.Queue()
+        self.worker = None
+        self.worker_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker.start()
+
+    def classify(self, text):
+        """Blocks until the batch holding this text is answered and returns its label."""
+        self._ensure_worker()
+        future = Future()
+        self.pending.put((text, future))
+        # Slightly above the HTTP timeout, so a stuck batch cannot hang the caller forever
+        return future.result(timeout=EMOTION_TIMEOUT + 10)
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                labels = classify_batch([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), label in zip(batch, labels):
+                future.set_result(label)
+
+emotion_batcher = EmotionBatcher()
+
+@functools.lru_cache(maxsize=1024)
+def classify_emotion(text):
+    """
+    Returns the top emotion label for a text.
+    Checks the SQLite cache first, so repeated stories skip the API call.
+    Failures raise instead of returning, so they are never cached.
+    """
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    with sqlite3.connect(CACHE_DB) as db:
+        row = db.execute("SELECT label FROM emotions WHERE text_hash = ?", (text_hash,)).fetchone()
+    if row:
+        return row[0]
+
+    label = emotion_batcher.classify(text)
+
+    with sqlite3.connect(CACHE_DB) as db:
+        db.execute("INSERT OR REPLACE INTO emotions (text_hash, label) VALUES (?, ?)", (text_hash, label))
+
+    return label
 
 def analyze_emotion(text):
     """Detects the emotion of the user's story."""
+    # Only the opening of the story is classified (see MAX_EMOTION_CHARS)
+    text = (text or "")[:MAX_EMOTION_CHARS]
     try:
         if not text: return "neutral"
-        response = hf_client.text_classification(text, model=EMOTION_MODEL)
-        top_emotion = sorted(response, key=lambda x: x['score'], reverse=True)[0]
-        
-        # Cleanup
-        del response
-        cleanup_memory()
-        
-        return top_emotion['label']
+        return classify_emotion(text)
     except Exception as e:
         print(f"Emotion Analysis Failed: {e}")
         return "neutral"
 
-def resize_for_video(image_path):
+@contextlib.contextmanager
+def borrow_svd_client():
+    """Lends one SVD client from the pool to the calling thread, connecting it on first use."""
+    client = svd_clients.get()
+    try:
+        if client is None:
+            client = GrClient(VIDEO_SPACE)
+        yield client
+    finally:
+        svd_clients.put(client)
+
+def content_key(data):
+    """Short sha256 hex digest used to name generated files after their inputs."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def warm_up():
+    """
+    Sends one dummy request to each model so the first user does not pay
+    the cold-start cost. Runs in a background thread at startup.
+    """
+    def connect_svd():
+        with borrow_svd_client():
+            pass
+
+    # The shared clients send X-Use-Cache: true, which would let the API answer
+    # from its cache without touching a model replica, so warm-up turns it off
+    def warm_emotion():
+        response = emotion_http.post(EMOTION_API_URL, json={"inputs": ["warmup"]}, headers={"X-Use-Cache": "false"})
+        response.raise_for_status()
+
+    def warm_image():
+        uncached_client = InferenceClient(token=HF_TOKEN, headers={"X-Use-Cache": "false"})
+        uncached_client.text_to_image("warmup", model=IMAGE_MODEL)
+
+    steps = [
+        ("Emotion Model", warm_emotion),
+        ("Image Model", warm_image),
+        ("Video Space", connect_svd),
+    ]
+    for name, step in steps:
+        try:
+            step()
+            print(f"🔥 {name} Warmed Up")
+        except Exception as e:
+            print(f"Warm-up Failed ({name}): {e}")
+
+def move_file(src, dst):
     """
-    Resizes image to 1024x576 for SVD.
+    Moves a file with a single rename when src and dst share a filesystem.
+    Across filesystems (EXDEV) it copies to a temp name next to dst and renames
+    that into place, so dst never exists half-written.
+    """
+    try:
+        os.rename(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    temp_path = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(src, temp_path)
+        os.replace(temp_path, dst)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    os.unlink(src)
+
+def resize_for_video(img, save_path=None):
+    """
+    Resizes an image (file path or PIL image) to 1024x576 for SVD.
     Saves as JPEG (smaller) to save RAM during upload.
+    Without a save_path the file gets a random name.
     """
-    img = Image.open(image_path)
+    if not isinstance(img, Image.Image):
+        img = Image.open(img)
+
+    # For JPEG sources, let libjpeg decode at a reduced scale (still >= 2x the target)
+    img.draft("RGB", (2048, 1152))
     
     # Convert to RGB to ensure we can save as JPG (removes Alpha channel if PNG)
     img = img.convert("RGB")
     
-    # Resize using Lanczos for quality
-    img = img.resize((1024, 576), Image.Resampling.LANCZOS)
+    # Scale + center-crop to exactly 1024x576 (keeps aspect ratio, Lanczos for quality)
+    img = ImageOps.fit(img, (1024, 576), Image.Resampling.LANCZOS)
     
-    # Save as JPG with optimization to keep file size low
-    filename = f"resized_{uuid.uuid4()}.jpg"
-    save_path = os.path.join("static/generated", filename)
-    img.save(save_path, quality=85, optimize=True)
+    # Save as progressive 4:2:0 JPG with optimized Huffman tables to keep the SVD upload small
+    if save_path is None:
+        filename = f"resized_{uuid.uuid4().hex}.jpg"
+        save_path = f"static/generated/{filename}"
+    # Write to a temp name first so a cached path never points at a half-written file
+    temp_path = f"{save_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        img.save(temp_path, "JPEG", quality=85, optimize=True, progressive=True, subsampling=2)
+        os.replace(temp_path, save_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
     
     # Close image to free memory
     img.close()
-    cleanup_memory()
     
     return save_path
 
+def save_preview(img, preview_path):
+    """
+    Writes the WebP browser preview of an image (file path or PIL image).
+    Goes through a temp file, so the preview never exists half-written.
+    """
+    if not isinstance(img, Image.Image):
+        img = Image.open(img)
+
+    temp_path = f"{preview_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        img.save(temp_path, "WEBP", quality=85, method=4)
+        os.replace(temp_path, preview_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def log_preview_error(future):
+    """Done-callback for background preview saves, so failures are not silently dropped."""
+    if future.exception():
+        print(f"Preview Save Failed: {future.exception()}")
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/generate', methods=['POST'])
-def generate():
-    try:
-        cleanup_memory() # Start fresh
-        
-        user_text = request.form.get('text')
-        user_image = request.files.get('image')
-        
-        print(f"🚀 Processing Request...")
+def run_pipeline(user_text, user_image=None):
+    """
+    Runs emotion -> image -> video for one request.
+    user_image is an optional file-like object holding the uploaded image.
+    Yields a progress event after each stage; the final one carries the video URL.
+    """
+    print(f"🚀 Processing Request...")
 
-        # --- Step A: Analyze Emotion ---
-        emotion = analyze_emotion(user_text)
+    # --- Step A: Analyze Emotion (runs in the background) ---
+    emotion_future = pool.submit(analyze_emotion, user_text)
+
+    # Browser preview of the generated image (text prompts only)
+    image_url = None
+    preview_future = None
+
+    # --- Step B: Get/Generate Base Image ---
+    if user_image:
+        # Decode straight from the upload bytes; only the resized copy hits disk
+        # (the emotion call keeps running meanwhile)
+        resized_path = resize_for_video(Image.open(user_image))
+    else:
+        # The style depends on the emotion, so wait for it here
+        emotion = emotion_future.result()
         print(f"🧠 Emotion Detected: {emotion}")
+        yield {"stage": "emotion", "emotion": emotion}
+
+        style = STYLE_MAP.get(emotion, "cinematic")
+        full_prompt = PROMPT_TMPL.format(text=user_text, style=style)
 
-        # --- Step B: Get/Generate Base Image ---
-        if user_image:
-            base_filename = f"upload_{uuid.uuid4()}.jpg"
-            base_path = os.path.join("static/generated", base_filename)
-            # Save uploaded file directly
-            user_image.save(base_path)
+        # Named after the model + prompt, so a repeated prompt reuses the earlier image
+        image_key = content_key(f"{IMAGE_MODEL}|{full_prompt}".encode("utf-8"))
+        resized_path = f"static/generated/gen_{image_key}.jpg"
+        preview_path = f"static/generated/gen_{image_key}.webp"
+        image_url = f"/{preview_path}"
+
+        if os.path.exists(resized_path):
+            print(f"♻️ Reusing Cached Image...")
+            if not os.path.exists(preview_path):
+                # Earlier save failed, is still running, or predates previews: rebuild from the JPEG
+                preview_future = pool.submit(save_preview, resized_path, preview_path)
         else:
-            style_map = {
-                "joy": "bright, vibrant, warm lighting, happy atmosphere",
-                "sadness": "rain, dark blue tones, cinematic, gloomy, lonely",
-                "fear": "misty, horror, dark, cold tones, mysterious",
-                "love": "romantic, soft focus, pink and red tones, dreamy",
-                "anger": "intense, red, fire, high contrast, dramatic",
-                "neutral": "cinematic, photorealistic"
-            }
-            style = style_map.get(emotion, "cinematic")
-            
-            full_prompt = f"{user_text}, {style}, 8k, highly detailed, movie scene"
             print(f"🎨 Generating Image...")
             
             # Generate Image
             generated_img = hf_client.text_to_image(full_prompt, model=IMAGE_MODEL)
+
+            # --- Step C: Resize for SVD ---
+            # Resized straight from memory; only the SVD input is written to disk
+            resize_for_video(generated_img, resized_path)
+
+            # WebP preview for the browser, written while SVD runs
+            # (SVD itself keeps the JPEG input)
+            preview_future = pool.submit(save_preview, generated_img, preview_path)
             
-            base_filename = f"gen_{uuid.uuid4()}.jpg"
-            base_path = os.path.join("static/generated", base_filename)
-            
-            # Save as JPG for smaller size
-            generated_img.save(base_path, quality=85)
-            
-            # Delete object from memory
+            # Drop our reference (the pending save keeps the image alive until done)
             del generated_img
-            cleanup_memory()
 
-        # --- Step C: Resize for SVD ---
-        resized_path = resize_for_video(base_path)
+    if preview_future is not None:
+        preview_future.add_done_callback(log_preview_error)
+
+    yield {"stage": "image"}
 
-        # --- Step D: Generate Video ---
+    # --- Step D: Generate Video ---
+    # Named after the Space + exact SVD input, so identical inputs reuse the earlier video
+    with open(resized_path, "rb") as f:
+        video_key = content_key(f"{VIDEO_SPACE}|{SVD_ARGS!r}|".encode("utf-8") + f.read())
+    final_video_name = f"dream_{video_key}.mp4"
+    final_video_path = f"static/generated/{final_video_name}"
+
+    if os.path.exists(final_video_path):
+        print(f"♻️ Reusing Cached Video...")
+    else:
         print("🎬 Connecting to Video Server (SVD)...")
         
-        # Initialize Client freshly for this request
-        client = GrClient(VIDEO_SPACE)
-        
-        result = client.predict(
-            handle_file(resized_path), 
-            0,                         
-            10,                        
-            api_name="/video"          
-        )
-        
-        # Cleanup Client immediately
-        del client
-        cleanup_memory()
+        with borrow_svd_client() as client:
+            result = client.predict(
+                handle_file(resized_path), 
+                *SVD_ARGS,
+                api_name="/video"          
+            )
         
         # Handle Result
         temp_video_path = result[0]['video']
-        final_video_name = f"dream_{uuid.uuid4()}.mp4"
-        final_video_path = os.path.join("static/generated", final_video_name)
-        
-        shutil.move(temp_video_path, final_video_path)
+        move_file(temp_video_path, final_video_path)
         print(f"✅ Video Saved!")
 
-        return jsonify({
-            "status": "success",
-            "video_url": f"/static/generated/{final_video_name}",
-            "emotion": emotion
-        })
+    # Uploads never needed the emotion earlier, so collect it only now
+    emotion = emotion_future.result()
+
+    # Only hand out the preview URL once the file is really there
+    # (the save normally finished long before SVD did)
+    if preview_future is not None:
+        try:
+            preview_future.result()
+        except Exception:
+            image_url = None
 
+    yield {
+        "stage": "video",
+        "status": "success",
+        "video_url": f"/static/generated/{final_video_name}",
+        "image_url": image_url,
+        "emotion": emotion
+    }
+
+def beat(owner):
+    """Records that this process is alive."""
+    with sqlite3.connect(CACHE_DB) as db:
+        db.execute("INSERT OR REPLACE INTO workers (owner, seen_at) VALUES (?, ?)", (owner, time.time()))
+
+def heartbeat_loop(owner):
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        try:
+            beat(owner)
+        except Exception as e:
+            print(f"Heartbeat Failed: {e}")
+
+def current_worker():
+    """
+    Returns this process's worker id, starting its heartbeat thread on first use.
+    Re-checked against the pid, so workers forked after import get their own id.
+    """
+    global worker_id, worker_pid
+    with worker_lock:
+        if worker_pid != os.getpid():
+            worker_pid = os.getpid()
+            worker_id = f"{worker_pid}-{uuid.uuid4().hex}"
+            beat(worker_id)
+            threading.Thread(target=heartbeat_loop, args=(worker_id,), daemon=True).start()
+        return worker_id
+
+def save_job(job_id, event):
+    """Stores the latest progress event of a job (visible to every worker via SQLite)."""
+    finished = event["stage"] in ("video", "error")
+    with sqlite3.connect(CACHE_DB) as db:
+        db.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, event, updated_at, owner, finished) VALUES (?, ?, ?, ?, ?)",
+            (job_id, json.dumps(event), time.time(), current_worker(), finished)
+        )
+
+def prune_jobs():
+    """
+    Deletes job rows older than JOB_RETENTION, but only finished ones or ones whose
+    worker is gone (queued jobs of a live worker are kept however old they are).
+    """
+    now = time.time()
+    with sqlite3.connect(CACHE_DB) as db:
+        db.execute(
+            "DELETE FROM jobs WHERE (updated_at IS NULL OR updated_at < ?) AND ("
+            "finished = 1 OR owner IS NULL "
+            "OR owner NOT IN (SELECT owner FROM workers WHERE seen_at >= ?))",
+            (now - JOB_RETENTION, now - WORKER_STALE_AFTER)
+        )
+        db.execute("DELETE FROM workers WHERE seen_at < ?", (now - JOB_RETENTION,))
+
+def run_job(job_id, user_text, image_data):
+    """Runs the pipeline in the background, recording each stage for /status."""
+    global pending_jobs
+    try:
+        for event in run_pipeline(user_text, image_data):
+            save_job(job_id, event)
     except Exception as e:
         print(f"❌ Error: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        save_job(job_id, {"stage": "error", "status": "error", "message": str(e)})
     finally:
-        # Final cleanup no matter what
-        cleanup_memory()
+        with pending_lock:
+            pending_jobs -= 1
+
+@app.route('/generate', methods=['POST'])
+def generate():
+    """Queues a generation job and returns its id immediately (poll /status/<job_id>)."""
+    global pending_jobs
+    with pending_lock:
+        if pending_jobs >= MAX_PENDING_JOBS:
+            return jsonify({"status": "error", "message": "Server is busy, please try again in a few minutes"}), 503
+        pending_jobs += 1
+
+    try:
+        user_text = request.form.get('text')
+        user_image = request.files.get('image')
+        # Read the upload now; the request is gone by the time the job runs
+        image_data = io.BytesIO(user_image.read()) if user_image else None
+
+        prune_jobs()
+
+        job_id = uuid.uuid4().hex
+        save_job(job_id, {"stage": "queued"})
+        job_pool.submit(run_job, job_id, user_text, image_data)
+    except Exception:
+        # The job never reached run_job, so release its slot here
+        with pending_lock:
+            pending_jobs -= 1
+        raise
+
+    return jsonify({"status": "accepted", "job_id": job_id}), 202
+
+@app.route('/status/<job_id>')
+def status(job_id):
+    """Returns the latest progress event of a job."""
+    with sqlite3.connect(CACHE_DB) as db:
+        row = db.execute(
+            "SELECT jobs.event, jobs.finished, workers.seen_at FROM jobs "
+            "LEFT JOIN workers ON workers.owner = jobs.owner WHERE jobs.job_id = ?",
+            (job_id,)
+        ).fetchone()
+    if not row:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+
+    event, finished, seen_at = json.loads(row[0]), row[1], row[2]
+    # An unfinished job is only lost when the worker holding it stopped beating,
+    # however long it has been waiting in the queue
+    if not finished and (seen_at is None or time.time() - seen_at > WORKER_STALE_AFTER):
+        event = {"stage": "error", "status": "error", "message": "Job was lost, please try again"}
+    return jsonify(event)
+
+# Warm the models up in the background so startup is not blocked
+threading.Thread(target=warm_up, daemon=True).start()
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    app.run(debug=os.getenv("FLASK_DEBUG", "false").lower() == "true", port=int(os.getenv("PORT", 5000)))